@@ -4,11 +4,48 @@ ROAMING_FOLDER_NAME = "Roaming"  # 要扫描的文件夹的名称
 MAX_RETRIES = 10  # 删除或复制失败后的最大重试次数
 RETRY_DELAY = 2  # 等待时间(秒)
 DISPLAY_FOLDER_COUNT = 10  # 要显示的最大文件夹排序的数量
+LARGE_FILE_THRESHOLD = 256 * 1024 * 1024  # 超过该大小(字节)的文件使用大文件复制模式
+COPY_CHUNK_SIZE = 64 * 1024 * 1024  # 大文件并行复制时每个分块的大小(字节)
+COPY_BUFFER_SIZE = 1024 * 1024  # 大文件复制时每次读写的缓冲区大小(字节)
+COPY_WORKERS = 4  # 大文件并行复制的线程数
+TEMP_MIN_AGE_HOURS = 24  # 临时文件最后修改时间超过该小时数才会被清理
+TEMP_MIN_FILE_SIZE = 0  # 只清理不小于该大小(字节)的临时文件
+TEMP_INCLUDE_PATTERNS = ['*']  # 要清理的临时文件名匹配规则
+TEMP_EXCLUDE_PATTERNS = [  # 不清理的文件或文件夹名匹配规则(通常被正在运行的程序占用)
+    '*.lock', '*.lck', '~$*',
+    'vscode-*', 'chrome_*', 'msedge_*', 'Teams*', 'WeChat*', 'WinGet',
+]
+WATCH_REPORT_INTERVAL = 60  # 监控模式下显示增长最快文件夹的间隔(秒)
+WATCH_FLUSH_INTERVAL = 1  # 监控模式下合并变更事件、重新统计目录的间隔(秒)
+THROTTLE_FILES_PER_SECOND = 500  # 限速复制时每秒最多复制的文件数
+THROTTLE_SAMPLE_INTERVAL = 1  # 限速复制时采样磁盘读延迟的间隔(秒)
+THROTTLE_LATENCY_FACTOR = 3  # 磁盘读延迟超过基线的倍数后开始退避
+THROTTLE_MIN_SCALE = 0.05  # 自适应退避时速率最低降到限速的比例
+THROTTLE_KEY_POLL_INTERVAL = 0.2  # 限速复制时检查调整限速按键的间隔(秒)
+MOVE_ESTIMATE_BYTES_PER_SECOND = 100 * 1024 * 1024  # 估算跨磁盘卷复制耗时使用的复制速度(字节/秒)
+MOVE_ESTIMATE_FILES_PER_SECOND = 300  # 估算跨磁盘卷复制耗时使用的每秒复制文件数
 
 __all__ = [
     'HIDDEN_FOLDER_NAME',
     'ROAMING_FOLDER_NAME',
     'MAX_RETRIES',
     'RETRY_DELAY',
-    'DISPLAY_FOLDER_COUNT'
+    'DISPLAY_FOLDER_COUNT',
+    'LARGE_FILE_THRESHOLD',
+    'COPY_CHUNK_SIZE',
+    'COPY_BUFFER_SIZE',
+    'COPY_WORKERS',
+    'TEMP_MIN_AGE_HOURS',
+    'TEMP_MIN_FILE_SIZE',
+    'TEMP_INCLUDE_PATTERNS',
+    'TEMP_EXCLUDE_PATTERNS',
+    'WATCH_REPORT_INTERVAL',
+    'WATCH_FLUSH_INTERVAL',
+    'THROTTLE_FILES_PER_SECOND',
+    'THROTTLE_SAMPLE_INTERVAL',
+    'THROTTLE_LATENCY_FACTOR',
+    'THROTTLE_MIN_SCALE',
+    'THROTTLE_KEY_POLL_INTERVAL',
+    'MOVE_ESTIMATE_BYTES_PER_SECOND',
+    'MOVE_ESTIMATE_FILES_PER_SECOND'
 ]
@@ -0,0 +1,224 @@
+# core/file_copier.py
+import os
+import sys
+import errno
+import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from config.config import LARGE_FILE_THRESHOLD, COPY_CHUNK_SIZE, COPY_BUFFER_SIZE, COPY_WORKERS
+from core.throttle import lower_thread_priority
+
+FSCTL_QUERY_ALLOCATED_RANGES = 0x000940CF
+FSCTL_SET_SPARSE = 0x000900C4
+ERROR_MORE_DATA = 234
+
+
+def copy_file(src, dst, throttle=None, size=None):
+    """
+    复制单个文件并保留元数据，返回文件大小
+    小文件直接使用 shutil.copy2，超过 LARGE_FILE_THRESHOLD 的文件自动切换到大文件复制模式
+    传入 throttle(CopyThrottle) 时按其限速复制；size 为扫描时记录的文件大小，传入时不再逐个 stat。
+    大文件按偏移量分块复制，复制前仍会重新获取大小，避免扫描后变大的文件被截断
+    """
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    if size is None:
+        size = os.stat(src).st_size
+    if size >= LARGE_FILE_THRESHOLD:
+        copy_large_file(src, dst, throttle=throttle)
+    else:
+        if throttle is not None:
+            throttle.consume_bytes(size)
+        shutil.copy2(src, dst)
+    return size
+
+
+def copy_large_file(src, dst, size=None, throttle=None):
+    """
+    大文件复制: 预分配目标文件，跳过稀疏文件中的空洞(目标文件同样保持稀疏)，按偏移量分块并行复制
+    Windows 上的非稀疏文件改为并行读取、按顺序写入(见 _copy_ordered)
+    限速时按缓冲区大小逐块取用令牌，复制线程使用较低的 CPU 和 I/O 优先级
+    """
+    if size is None:
+        size = os.stat(src).st_size
+    extents = _data_extents(src, size)
+    sparse = sum(end - start for start, end in extents) < size
+
+    # 先创建目标文件并设置好大小，之后各线程按偏移量写入
+    with open(dst, 'wb') as f:
+        _preallocate(f.fileno(), size, sparse)
+
+    chunks = []
+    for start, end in extents:
+        for offset in range(start, end, COPY_CHUNK_SIZE):
+            chunks.append((offset, min(offset + COPY_CHUNK_SIZE, end)))
+
+    initializer = lower_thread_priority if throttle is not None else None
+    if sys.platform == 'win32' and not sparse and len(chunks) > 1:
+        _copy_ordered(src, dst, size, throttle, initializer)
+    elif len(chunks) <= 1:
+        for start, end in chunks:
+            _copy_range(src, dst, start, end, throttle)
+    else:
+        with ThreadPoolExecutor(max_workers=COPY_WORKERS, initializer=initializer) as pool:
+            futures = [pool.submit(_copy_range, src, dst, start, end, throttle)
+                       for start, end in chunks]
+            for future in futures:
+                future.result()
+    shutil.copystat(src, dst)
+
+
+def _data_extents(path, size):
+    """
+    使用 SEEK_DATA/SEEK_HOLE(Windows 上为 FSCTL_QUERY_ALLOCATED_RANGES)找出文件中有数据的区间 [(start, end), ...]
+    平台或文件系统不支持时把整个文件视为一个数据区间
+    """
+    if size == 0:
+        return []
+    if sys.platform == 'win32':
+        return _allocated_ranges_win32(path, size)
+    if not hasattr(os, 'SEEK_DATA') or not hasattr(os, 'SEEK_HOLE'):
+        return [(0, size)]
+    extents = []
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        offset = 0
+        while offset < size:
+            try:
+                start = os.lseek(fd, offset, os.SEEK_DATA)
+            except OSError as e:
+                if e.errno == errno.ENXIO:  # 剩余部分全是空洞
+                    break
+                return [(0, size)]
+            end = min(os.lseek(fd, start, os.SEEK_HOLE), size)
+            extents.append((start, end))
+            offset = end
+    except OSError:
+        return [(0, size)]
+    finally:
+        os.close(fd)
+    return extents
+
+
+def _allocated_ranges_win32(path, size):
+    """通过 FSCTL_QUERY_ALLOCATED_RANGES 查询 NTFS 文件已分配的区间，查询失败时把整个文件视为一个数据区间"""
+    import ctypes
+    import msvcrt
+    from ctypes import wintypes
+
+    class FileAllocatedRangeBuffer(ctypes.Structure):
+        _fields_ = [('FileOffset', ctypes.c_longlong), ('Length', ctypes.c_longlong)]
+
+    kernel32 = ctypes.windll.kernel32
+    extents = []
+    query = FileAllocatedRangeBuffer(0, size)
+    ranges = (FileAllocatedRangeBuffer * 64)()
+    try:
+        with open(path, 'rb') as f:
+            handle = wintypes.HANDLE(msvcrt.get_osfhandle(f.fileno()))
+            while True:
+                returned = wintypes.DWORD(0)
+                ok = kernel32.DeviceIoControl(handle, FSCTL_QUERY_ALLOCATED_RANGES,
+                                              ctypes.byref(query), ctypes.sizeof(query),
+                                              ranges, ctypes.sizeof(ranges), ctypes.byref(returned), None)
+                if not ok and ctypes.GetLastError() != ERROR_MORE_DATA:
+                    return [(0, size)]
+                count = returned.value // ctypes.sizeof(FileAllocatedRangeBuffer)
+                for item in ranges[:count]:
+                    extents.append((item.FileOffset, min(item.FileOffset + item.Length, size)))
+                if ok or count == 0:
+                    break
+                # 结果放不下时从最后一个区间之后继续查询
+                query.FileOffset = ranges[count - 1].FileOffset + ranges[count - 1].Length
+                query.Length = size - query.FileOffset
+    except OSError:
+        return [(0, size)]
+    return extents
+
+
+def _set_sparse_win32(fd):
+    """通过 FSCTL_SET_SPARSE 把目标文件标记为稀疏文件，设置失败时按普通文件复制"""
+    import ctypes
+    import msvcrt
+    from ctypes import wintypes
+    returned = wintypes.DWORD(0)
+    ctypes.windll.kernel32.DeviceIoControl(wintypes.HANDLE(msvcrt.get_osfhandle(fd)), FSCTL_SET_SPARSE,
+                                           None, 0, None, 0, ctypes.byref(returned), None)
+
+
+def _preallocate(fd, size, sparse):
+    """
+    预分配目标文件空间; 稀疏文件只设置文件长度，保留空洞
+    Windows 上需要先把目标文件标记为稀疏文件，否则设置长度时会为空洞分配磁盘空间
+    """
+    if sparse and sys.platform == 'win32':
+        _set_sparse_win32(fd)
+    if not sparse and hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError:
+            pass
+    os.ftruncate(fd, size)
+
+
+def _copy_ordered(src, dst, size, throttle=None, initializer=None):
+    """
+    多个线程并行读取，当前线程按顺序写入目标文件
+    NTFS 在有效数据长度(Valid Data Length)之后写入时要先把中间部分补零，
+    非稀疏文件按偏移量乱序并行写入会让补零串行化、大部分数据写两遍，因此只并行读取。
+    同时进行中的读取不超过 COPY_WORKERS * 2 个缓冲区
+    """
+    pending = deque()
+    offsets = iter(range(0, size, COPY_BUFFER_SIZE))
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS, initializer=initializer) as pool, \
+            open(dst, 'r+b', buffering=0) as fdst:
+        try:
+            for offset in offsets:
+                pending.append(pool.submit(_read_range, src, offset, min(offset + COPY_BUFFER_SIZE, size), throttle))
+                if len(pending) >= COPY_WORKERS * 2:
+                    _write_at(fdst, *pending.popleft().result())
+            while pending:
+                _write_at(fdst, *pending.popleft().result())
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _read_range(src, start, end, throttle=None):
+    """读取文件中 [start, end) 区间的数据，返回(start, 数据)"""
+    with open(src, 'rb', buffering=0) as fsrc:
+        fsrc.seek(start)
+        data = fsrc.read(end - start)
+    if throttle is not None:
+        throttle.consume_bytes(len(data))
+    return start, data
+
+
+def _write_at(f, offset, data):
+    """在 offset 处写入全部数据(写入位置按顺序递增)"""
+    f.seek(offset)
+    view = memoryview(data)
+    written = 0
+    while written < len(view):
+        written += f.write(view[written:])
+
+
+def _copy_range(src, dst, start, end, throttle=None):
+    """复制文件中 [start, end) 区间的数据，每个线程使用独立的文件句柄"""
+    buffer = bytearray(min(COPY_BUFFER_SIZE, end - start))
+    view = memoryview(buffer)
+    with open(src, 'rb', buffering=0) as fsrc, open(dst, 'r+b', buffering=0) as fdst:
+        fsrc.seek(start)
+        fdst.seek(start)
+        offset = start
+        while offset < end:
+            read = fsrc.readinto(view[:min(len(buffer), end - offset)])
+            if not read:
+                break
+            if throttle is not None:
+                throttle.consume_bytes(read)
+            written = 0
+            while written < read:
+                written += fdst.write(view[written:read])
+            offset += read
@@ -1,85 +1,125 @@
 # core/folder_manager.py
 import os
-import shutil
 import ctypes
 import subprocess
 import tqdm
 import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from config.config import HIDDEN_FOLDER_NAME, ROAMING_FOLDER_NAME
 from ui.user_interface import delete_file_or_folder
+from core.scan_tree import scan_tree, fresh_tree, PathList
+from core.file_copier import copy_file
+from core.throttle import lower_thread_priority
+from core.move_planner import is_same_device, plan_move, rename_folder
 
+PERMISSION_MODE = stat.S_IRWXU | stat.S_IRWXG | stat.S_IRWXO
 
-def copy_with_progress(src, dst):
-    """使用 tqdm 显示复制进度"""
-    total_files = sum(len(files) for _, _, files in os.walk(src))
-    copied_files = 0
-    failed_files = []
-    # 然后确保所有空文件夹也被创建
-    empty_folders = []
+
+def copy_with_progress(src, dst, throttle=None, tree=None, validated=False):
+    """
+    使用 tqdm 显示复制进度，传入 throttle(CopyThrottle) 时限速并在低优先级的工作线程中复制
+    tree 为之前扫描 src 得到的目录树，未过期时直接复用，不再重复遍历源目录；
+    validated=True 表示调用方刚检查过 tree 没有过期，不再重复检查
+    """
+    failed_files = PathList()
+    # 创建失败的文件夹
+    empty_folders = PathList()
     # 修改文件权限
     if os.path.isfile(src):
         # 获取文件所在目录
         folder_path = os.path.dirname(src)
         _modify_permissions_recursive(folder_path)
     else:
-        _modify_permissions_recursive(src)
-    # 首先复制文件
+        if not validated:
+            tree = fresh_tree(tree, src)
+        _modify_permissions_tree(tree)
+    if tree is None:
+        return 0, failed_files, empty_folders
+    total_files = tree.total_file_count()
     with tqdm.tqdm(total=total_files, unit='file', desc='Copying files') as pbar:
-        for root, dirs, files in os.walk(src):
-            for file in files:
-                src_path = os.path.join(root, file)
-                rel_path = os.path.relpath(src_path, src)
-                dst_path = os.path.join(dst, rel_path)
-                try:
-                    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
-                    shutil.copy2(src_path, dst_path)
-                    pbar.update(1)
-                    copied_files += 1
-                except Exception as e:
-                    failed_files.append((src_path, str(e)))
-                    # 打印错误信息
-                    pbar.write(f"\n文件复制过程中出现错误: {e}")
-                    pbar.write(f"继续复制其它文件...")
-    # 遍历所有文件夹，包括空文件夹
-    for root, dirs, files in os.walk(src):
-        for dir_name in dirs:
-            src_dir_path = os.path.join(root, dir_name)
-            rel_dir_path = os.path.relpath(src_dir_path, src)
-            dst_dir_path = os.path.join(dst, rel_dir_path)
+        args = (src, dst, tree, throttle, pbar, failed_files, empty_folders)
+        if throttle is None:
+            copied_files = _copy_tree_files(*args)
+        else:
+            from ui.user_interface import watch_throttle_keys
+            # 按键由单独的线程检查，复制大文件的过程中也能调整限速
+            stop = threading.Event()
+            watcher = threading.Thread(target=watch_throttle_keys, args=(throttle, pbar, stop), daemon=True)
+            watcher.start()
             try:
-                os.makedirs(dst_dir_path, exist_ok=True)
-            except Exception as e:
-                print(f"创建文件夹 {dst_dir_path}时出现错误: {e}")
-                empty_folders.append((src_dir_path, str(e)))
+                # 限速复制时只降低专用工作线程的优先级，主线程保持不变
+                with ThreadPoolExecutor(max_workers=1, initializer=lower_thread_priority) as pool:
+                    copied_files = pool.submit(_copy_tree_files, *args).result()
+            finally:
+                stop.set()
+                watcher.join()
     return copied_files, failed_files, empty_folders
 
 
+def _copy_tree_files(src, dst, tree, throttle, pbar, failed_files, empty_folders):
+    """按先序依次创建每个文件夹(包括空文件夹)，再复制其中的文件，返回复制成功的文件数"""
+    copied_files = 0
+    for node in range(len(tree)):
+        src_dir_path = tree.path(node)
+        dst_dir_path = os.path.join(dst, os.path.relpath(src_dir_path, src))
+        try:
+            os.makedirs(dst_dir_path, exist_ok=True)
+        except Exception as e:
+            pbar.write(f"创建文件夹 {dst_dir_path}时出现错误: {e}")
+            empty_folders.append(src_dir_path, str(e))
+        for file, size in tree.files(node):
+            src_path = os.path.join(src_dir_path, file)
+            dst_path = os.path.join(dst_dir_path, file)
+            try:
+                if throttle is not None:
+                    throttle.consume_file()
+                copy_file(src_path, dst_path, throttle, size)
+                pbar.update(1)
+                copied_files += 1
+            except Exception as e:
+                failed_files.append(src_path, str(e))
+                # 打印错误信息
+                pbar.write(f"\n文件复制过程中出现错误: {e}")
+                pbar.write(f"继续复制其它文件...")
+    return copied_files
+
+
 def _modify_permissions_recursive(path):
     """
     递归修改指定路径及其所有子项的权限
     """
+    if os.path.isdir(path):
+        _modify_permissions_tree(scan_tree(path, with_files=True))
+        return
     try:
-        # 修改当前目录或文件的权限
-        os.chmod(path, stat.S_IRWXU | stat.S_IRWXG | stat.S_IRWXO)
-
-        # 如果是目录，递归修改子项
-        if os.path.isdir(path):
-            for item in os.listdir(path):
-                item_path = os.path.join(path, item)
-                _modify_permissions_recursive(item_path)
+        os.chmod(path, PERMISSION_MODE)
     except Exception as e:
         print(f"修改权限时发生错误: {path}, 错误: {e}")
 
 
-def create_directory_junction(original_dir, target_dir):
+def _modify_permissions_tree(tree):
+    """按已经检查过没有过期的目录树修改所有目录和文件的权限"""
+    for node in range(len(tree)):
+        dir_path = tree.path(node)
+        targets = [dir_path]
+        targets.extend(os.path.join(dir_path, file) for file, _ in tree.files(node))
+        for target in targets:
+            try:
+                os.chmod(target, PERMISSION_MODE)
+            except Exception as e:
+                print(f"修改权限时发生错误: {target}, 错误: {e}")
+
+
+def create_directory_junction(original_dir, target_dir, tree=None):
     """创建Windows目录链接(Junction Point)
-    在创建链接前删除原目录及其所有内容
+    在创建链接前删除原目录及其所有内容，tree 为之前扫描原目录得到的目录树
     """
     try:
         # 检查原目录是否存在，如果存在则删除
         if os.path.exists(original_dir):
             success = delete_file_or_folder(
-                original_dir)
+                original_dir, tree)
             if success == False:
                 return False
 
@@ -183,8 +223,11 @@ def select_destination_drive():
         print(f"选择目标磁盘时出错,function of select_destination_drive: {e}")
 
 
-def prepare_destination_path(selected_folder_name, required_space=None):
-    """准备目标路径，创建必要的目录结构"""
+def prepare_destination_path(selected_folder_name, required_space=None, src_path=None):
+    """
+    准备目标路径，创建必要的目录结构
+    src_path 与所选磁盘在同一磁盘卷时会直接重命名，不占用额外空间，因此不检查剩余空间
+    """
     from ui.user_interface import confirm_overwrite
     # 让用户选择目标磁盘
     drive_path = select_destination_drive()
@@ -192,8 +235,9 @@ def prepare_destination_path(selected_folder_name, required_space=None):
     # 检查用户是否选择了退出
     if drive_path is None:
         return None
-    # 检查剩余空间是否足够
-    if required_space is not None:
+    # 先确定移动方式，只有需要复制时才检查剩余空间是否足够
+    same_device = src_path is not None and is_same_device(src_path, drive_path)
+    if required_space is not None and not same_device:
         if not check_disk_space(drive_path, required_space):
             print(f"磁盘 {drive_path} 剩余空间不足，无法完成复制操作。")
             return None
@@ -218,13 +262,36 @@ def prepare_destination_path(selected_folder_name, required_space=None):
     return dest_folder_path
 
 
-def perform_copy_operation(src_folder, dest_folder, folder_name):
-    """执行文件夹复制操作并处理可能出现的问题"""
-    from ui.user_interface import show_copy_results, re_copy_failed_files
+def perform_copy_operation(src_folder, dest_folder, folder_name, tree=None):
+    """
+    执行文件夹移动操作并处理可能出现的问题，tree 为扫描源文件夹时得到的目录树
+    源和目标在同一磁盘卷时直接重命名，否则复制后删除源文件夹
+    """
+    from ui.user_interface import show_copy_results, re_copy_failed_files, ask_copy_throttle, show_move_plan
+    rename_failed = False
+    # 同一磁盘卷内直接重命名，然后创建链接
+    if is_same_device(src_folder, dest_folder):
+        show_move_plan(plan_move(src_folder, dest_folder))
+        print(f"正在移动 {folder_name} 到 {os.path.dirname(dest_folder)}...")
+        if rename_folder(src_folder, dest_folder):
+            create_directory_junction(src_folder, dest_folder)
+            return
+        print("重命名失败，改为复制文件夹")
+        rename_failed = True
+    # 询问是否限速复制
+    throttle = ask_copy_throttle()
+    plan = plan_move(src_folder, dest_folder, tree, throttle, allow_rename=False)
+    show_move_plan(plan)
+    # 选择磁盘时按重命名处理没有检查剩余空间，改为复制前补充检查
+    if rename_failed:
+        drive_path = os.path.splitdrive(os.path.abspath(dest_folder))[0] + os.sep
+        if not check_disk_space(drive_path, plan.total_size):
+            print(f"磁盘 {drive_path} 剩余空间不足，无法完成复制操作。")
+            return
     # 复制选定的文件夹到目标路径
     print(f"正在复制 {folder_name} 到 {os.path.dirname(dest_folder)}...")
     copied, failed_files, failed_folders = copy_with_progress(
-        src_folder, dest_folder)
+        src_folder, dest_folder, throttle, plan.tree, validated=True)
 
     # 处理复制失败的文件
     retry_success_count = 0
@@ -234,4 +301,4 @@ def perform_copy_operation(src_folder, dest_folder, folder_name):
 
     # 显示复制结果
     show_copy_results(copied, retry_success_count,
-                      failed_folders, src_folder, dest_folder)
+                      failed_folders, src_folder, dest_folder, plan.tree)
@@ -1,21 +1,13 @@
 # core/folder_scanner.py
-import os
 from utils.convert_size import convert_size
 from utils.path_utils import is_junction_point
 from config.config import DISPLAY_FOLDER_COUNT
+from core.scan_tree import scan_tree
 
 
 def calculate_folder_size(folder_path):
     """计算文件夹的总大小"""
-    total_size = 0
-    for root, dirs, files in os.walk(folder_path):
-        for file in files:
-            try:
-                file_path = os.path.join(root, file)
-                total_size += os.path.getsize(file_path)
-            except Exception as e:
-                print(f"Error getting size for {file_path}: {e}")
-    return total_size
+    return scan_tree(folder_path).total_size()
 
 
 def collect_folder_information(base_path):
@@ -23,13 +15,12 @@ def collect_folder_information(base_path):
     print(f"Scanning files in folder: {base_path} ...")
     folders = []
 
-    # 遍历文件夹下的一级项目
-    for item in os.listdir(base_path):
-        item_path = os.path.join(base_path, item)
-        if os.path.isdir(item_path):
-            folder_size = calculate_folder_size(item_path)
-            is_junction = is_junction_point(item_path)
-            folders.append((item_path, folder_size, is_junction))
+    # 只扫描一次整个目录树，再从树中读取一级文件夹的汇总大小
+    tree = scan_tree(base_path)
+    for node in tree.children():
+        item_path = tree.path(node)
+        is_junction = is_junction_point(item_path)
+        folders.append((item_path, tree.total_size(node), is_junction))
 
     # 按文件夹大小排序（从大到小）
     folders.sort(key=lambda x: x[1], reverse=True)
@@ -0,0 +1,343 @@
+# core/folder_watcher.py
+import os
+import abc
+import sys
+import time
+import queue
+import select
+import struct
+import threading
+import ctypes
+import ctypes.util
+from utils.convert_size import convert_size
+from config.config import DISPLAY_FOLDER_COUNT, WATCH_REPORT_INTERVAL, WATCH_FLUSH_INTERVAL
+from core.scan_tree import scan_tree
+
+
+class WatchBackend(abc.ABC):
+    """
+    文件系统变更通知后端的基类
+    read_events 返回 [(路径, 类型, 是否为目录), ...]，类型为 'created'、'removed'、'modified'
+    或 'overflow'(事件丢失，需要全部刷新)，是否为目录未知时为 None。
+    recursive 为 True 的后端只需监视根目录即可收到所有子目录的事件。
+    """
+    recursive = False
+
+    @abc.abstractmethod
+    def add_watch(self, path):
+        """开始监视目录"""
+
+    @abc.abstractmethod
+    def read_events(self, timeout):
+        """等待最多 timeout 秒，返回这段时间内收到的变更事件"""
+
+    def close(self):
+        pass
+
+
+class InotifyBackend(WatchBackend):
+    """Linux inotify 后端，每个目录单独添加监视"""
+    IN_MODIFY = 0x00000002
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    WATCH_MASK = IN_MODIFY | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    _EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 调用失败")
+        self._paths = {}  # 监视编号 -> 目录路径
+        self._warned = False
+
+    def add_watch(self, path):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), self.WATCH_MASK)
+        if wd < 0:
+            if not self._warned:
+                print(f"无法监视目录 {path}: {os.strerror(ctypes.get_errno())}")
+                self._warned = True
+            return
+        self._paths[wd] = path
+
+    def read_events(self, timeout):
+        events = []
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return events
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return events
+        offset = 0
+        header_size = self._EVENT_HEADER.size
+        while offset < len(data):
+            wd, mask, _, length = self._EVENT_HEADER.unpack_from(data, offset)
+            name = os.fsdecode(data[offset + header_size:offset + header_size + length].rstrip(b'\0'))
+            offset += header_size + length
+            if mask & self.IN_Q_OVERFLOW:
+                events.append((None, 'overflow', None))
+                continue
+            if mask & self.IN_IGNORED:
+                self._paths.pop(wd, None)
+                continue
+            folder = self._paths.get(wd)
+            if folder is None or not name:
+                continue
+            path = os.path.join(folder, name)
+            is_dir = bool(mask & self.IN_ISDIR)
+            if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                events.append((path, 'created', is_dir))
+            elif mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+                events.append((path, 'removed', is_dir))
+            else:
+                events.append((path, 'modified', is_dir))
+        return events
+
+    def close(self):
+        os.close(self._fd)
+
+
+class WindowsBackend(WatchBackend):
+    """Windows ReadDirectoryChangesW 后端，在后台线程中监视整个子树"""
+    recursive = True
+    FILE_LIST_DIRECTORY = 0x0001
+    FILE_SHARE_ALL = 0x00000001 | 0x00000002 | 0x00000004
+    OPEN_EXISTING = 3
+    FILE_FLAG_BACKUP_SEMANTICS = 0x02000000
+    NOTIFY_FILTER = 0x00000001 | 0x00000002 | 0x00000008 | 0x00000010  # 文件名、目录名、大小、修改时间
+    ACTIONS = {1: 'created', 2: 'removed', 3: 'modified', 4: 'removed', 5: 'created'}
+    _EVENT_HEADER = struct.Struct('III')
+
+    def __init__(self):
+        from ctypes import wintypes
+        self._kernel32 = ctypes.windll.kernel32
+        self._kernel32.CreateFileW.restype = wintypes.HANDLE
+        self._queue = queue.Queue()
+        self._handles = []
+
+    def add_watch(self, path):
+        handle = self._kernel32.CreateFileW(path, self.FILE_LIST_DIRECTORY, self.FILE_SHARE_ALL, None,
+                                            self.OPEN_EXISTING, self.FILE_FLAG_BACKUP_SEMANTICS, None)
+        if handle is None or handle == ctypes.c_void_p(-1).value:
+            print(f"无法监视目录 {path}: {ctypes.WinError()}")
+            return
+        self._handles.append(handle)
+        threading.Thread(target=self._watch, args=(handle, path), daemon=True).start()
+
+    def _watch(self, handle, root):
+        from ctypes import wintypes
+        buffer = ctypes.create_string_buffer(64 * 1024)
+        returned = wintypes.DWORD()
+        while True:
+            ok = self._kernel32.ReadDirectoryChangesW(handle, buffer, len(buffer), True, self.NOTIFY_FILTER,
+                                                      ctypes.byref(returned), None, None)
+            if not ok:
+                break
+            if returned.value == 0:
+                # 缓冲区溢出，事件已丢失
+                self._queue.put((None, 'overflow', None))
+                continue
+            data = buffer.raw[:returned.value]
+            offset = 0
+            while True:
+                next_offset, action, length = self._EVENT_HEADER.unpack_from(data, offset)
+                start = offset + self._EVENT_HEADER.size
+                name = data[start:start + length].decode('utf-16-le')
+                kind = self.ACTIONS.get(action)
+                if kind is not None:
+                    self._queue.put((os.path.join(root, name), kind, None))
+                if next_offset == 0:
+                    break
+                offset += next_offset
+
+    def read_events(self, timeout):
+        events = []
+        try:
+            events.append(self._queue.get(timeout=timeout))
+            while True:
+                events.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return events
+
+    def close(self):
+        for handle in self._handles:
+            self._kernel32.CancelIoEx(handle, None)
+            self._kernel32.CloseHandle(handle)
+        self._handles = []
+
+
+def create_backend():
+    """根据当前平台选择变更通知后端"""
+    if sys.platform == 'win32':
+        return WindowsBackend()
+    if sys.platform.startswith('linux'):
+        return InotifyBackend()
+    raise OSError(f"当前系统({sys.platform})不支持文件夹监控")
+
+
+class FolderWatcher:
+    """
+    根据文件系统变更通知增量维护各个一级文件夹的大小
+    启动时完整扫描一次，之后只重新统计发生变化的目录自身的文件，把差值累加到所属的一级文件夹上。
+    """
+
+    def __init__(self, base_path, backend=None):
+        self.base_path = base_path
+        self.backend = backend if backend is not None else create_backend()
+        self.tree = scan_tree(base_path)
+        self._index = {self.tree.path(node): node for node in range(len(self.tree))}
+        self._children = {}  # 目录编号 -> 子目录编号集合，删除目录时只遍历被删除的子树
+        for node in range(1, len(self.tree)):
+            self._children.setdefault(self.tree.parent(node), set()).add(node)
+        self._baseline = {node: self.tree.total_size(node) for node in self.tree.children()}
+        self._totals = dict(self._baseline)
+        self._dirty = set()
+        self.started = time.time()
+        if self.backend.recursive:
+            self.backend.add_watch(base_path)
+        else:
+            for path in self._index:
+                self.backend.add_watch(path)
+
+    def process(self, events):
+        """处理一批变更事件，只标记需要重新统计的目录"""
+        for path, kind, is_dir in events:
+            if kind == 'overflow':
+                self._dirty.update(self._index.values())
+                continue
+            parent = self._index.get(os.path.dirname(path))
+            if parent is None:
+                continue
+            self._dirty.add(parent)
+            node = self._index.get(path)
+            if kind == 'removed' and node is not None:
+                self._forget(node)
+            elif kind == 'created' and node is None:
+                if is_dir or (is_dir is None and os.path.isdir(path)):
+                    self._attach(parent, path)
+
+    def flush(self):
+        """重新统计所有被标记的目录"""
+        dirty, self._dirty = self._dirty, set()
+        for node in dirty:
+            self._refresh(node)
+
+    def growth(self):
+        """返回[(文件夹路径, 增长大小, 当前大小), ...]，按增长大小从大到小排序"""
+        result = [(self.tree.path(node), total - self._baseline.get(node, 0), total)
+                  for node, total in self._totals.items()]
+        result.sort(key=lambda x: x[1], reverse=True)
+        return result
+
+    def close(self):
+        self.backend.close()
+
+    def _top_folder(self, node):
+        """返回目录所属的一级文件夹编号，根目录本身返回 None"""
+        while node > 0 and self.tree.parent(node) > 0:
+            node = self.tree.parent(node)
+        return node if node > 0 else None
+
+    def _apply(self, node, size, count):
+        """把目录自身文件的新统计值写入目录树，并把差值累加到一级文件夹"""
+        delta = size - self.tree.own_size(node)
+        self.tree.add_files(node, delta, count - self.tree.own_file_count(node))
+        top = self._top_folder(node)
+        if top is not None and delta:
+            self._totals[top] = self._totals.get(top, 0) + delta
+
+    def _refresh(self, node):
+        size = 0
+        count = 0
+        try:
+            with os.scandir(self.tree.path(node)) as it:
+                for entry in it:
+                    try:
+                        if not entry.is_dir():
+                            size += entry.stat().st_size
+                            count += 1
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        self._apply(node, size, count)
+
+    def _forget(self, node):
+        """目录被删除或移走，清零它及其所有子目录；一级文件夹被删除时不再显示它"""
+        self._children.get(self.tree.parent(node), set()).discard(node)
+        top = self._top_folder(node)
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            stack.extend(self._children.pop(current, ()))
+            self._index.pop(self.tree.path(current), None)
+            self._dirty.discard(current)
+            self._apply(current, 0, 0)
+        if top == node:
+            self._totals.pop(node, None)
+            self._baseline.pop(node, None)
+
+    def _attach(self, parent, path):
+        """新建或移入的目录: 先添加监视再扫描，然后把扫描结果接到目录树上"""
+        if not self.backend.recursive:
+            self.backend.add_watch(path)
+        subtree = scan_tree(path)
+        nodes = []
+        for sub_node in range(len(subtree)):
+            sub_parent = subtree.parent(sub_node)
+            if sub_parent < 0:
+                node = self.tree.add_dir(parent, os.path.basename(path))
+            else:
+                node = self.tree.add_dir(nodes[sub_parent], subtree.name(sub_node))
+            nodes.append(node)
+            self._children.setdefault(self.tree.parent(node), set()).add(node)
+            sub_path = subtree.path(sub_node)
+            self._index[sub_path] = node
+            if sub_node > 0 and not self.backend.recursive:
+                self.backend.add_watch(sub_path)
+            if parent == 0 and sub_parent < 0:
+                self._baseline[node] = 0
+                self._totals[node] = 0
+            self._apply(node, subtree.own_size(sub_node), subtree.own_file_count(sub_node))
+
+
+def display_growing_folders(watcher, display_count=DISPLAY_FOLDER_COUNT):
+    """打印增长最快的文件夹"""
+    elapsed = max(time.time() - watcher.started, 1)
+    print(f"\n=============增长最快的{display_count}个文件夹(已监控{int(elapsed)}秒)=============")
+    for i, (folder_path, grown, total) in enumerate(watcher.growth()[:display_count], 1):
+        sign = "-" if grown < 0 else "+"
+        rate = abs(grown) * 3600 / elapsed
+        print(f"{i}. {folder_path}: {convert_size(total)} ({sign}{convert_size(abs(grown))}, "
+              f"{sign}{convert_size(rate)}/小时)")
+
+
+def watch_folder_growth(base_path, report_interval=WATCH_REPORT_INTERVAL):
+    """持续监控文件夹大小变化，定期打印增长最快的文件夹，按 Ctrl+C 停止"""
+    print(f"Scanning files in folder: {base_path} ...")
+    watcher = FolderWatcher(base_path)
+    print(f"开始监控 {base_path}，每{report_interval}秒显示一次，按 Ctrl+C 停止")
+    next_flush = time.time() + WATCH_FLUSH_INTERVAL
+    next_report = time.time() + report_interval
+    try:
+        while True:
+            timeout = max(0, min(next_flush, next_report) - time.time())
+            watcher.process(watcher.backend.read_events(timeout))
+            now = time.time()
+            if now >= next_flush:
+                watcher.flush()
+                next_flush = now + WATCH_FLUSH_INTERVAL
+            if now >= next_report:
+                display_growing_folders(watcher)
+                next_report = now + report_interval
+    except KeyboardInterrupt:
+        print("\n已停止监控")
+    finally:
+        watcher.close()
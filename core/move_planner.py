@@ -0,0 +1,72 @@
+# core/move_planner.py
+import os
+from config.config import MOVE_ESTIMATE_BYTES_PER_SECOND, MOVE_ESTIMATE_FILES_PER_SECOND
+from core.scan_tree import fresh_tree
+
+MOVE_RENAME = 'rename'  # 源和目标在同一磁盘卷，直接重命名
+MOVE_COPY = 'copy'      # 源和目标在不同磁盘卷，复制后删除源文件夹
+
+
+class MovePlan:
+    """文件夹移动方案: 采用的方式、数据量和预计耗时"""
+    __slots__ = ('src', 'dst', 'strategy', 'total_size', 'file_count', 'estimated_seconds', 'tree')
+
+    def __init__(self, src, dst, strategy, total_size=0, file_count=0, estimated_seconds=0.0, tree=None):
+        self.src = src
+        self.dst = dst
+        self.strategy = strategy
+        self.total_size = total_size
+        self.file_count = file_count
+        self.estimated_seconds = estimated_seconds
+        self.tree = tree  # 复制方案使用的源目录树，供复制步骤复用
+
+
+def _existing_ancestor(path):
+    """返回路径自身或最近的已存在的上级目录"""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def is_same_device(src, dst):
+    """比较源路径和目标路径(或其最近的已存在上级目录)所在设备的 st_dev"""
+    try:
+        return os.stat(src).st_dev == os.stat(_existing_ancestor(dst)).st_dev
+    except OSError:
+        return False
+
+
+def plan_move(src, dst, tree=None, throttle=None, allow_rename=True):
+    """
+    生成移动方案: 同一磁盘卷直接重命名(耗时可忽略)，否则走复制流程并估算耗时
+    tree 为之前扫描 src 得到的目录树，throttle 为限速设置(估算时取较低的速度)
+    allow_rename=False 时总是生成复制方案(例如重命名失败后)
+    """
+    if allow_rename and is_same_device(src, dst):
+        return MovePlan(src, dst, MOVE_RENAME)
+    tree = fresh_tree(tree, src)
+    total_size = tree.total_size()
+    file_count = tree.total_file_count()
+    bytes_rate = MOVE_ESTIMATE_BYTES_PER_SECOND
+    files_rate = MOVE_ESTIMATE_FILES_PER_SECOND
+    if throttle is not None:
+        if throttle.bytes_per_second is not None:
+            bytes_rate = min(bytes_rate, throttle.bytes_per_second)
+        if throttle.files_per_second is not None:
+            files_rate = min(files_rate, throttle.files_per_second)
+    estimated_seconds = total_size / bytes_rate + file_count / files_rate
+    return MovePlan(src, dst, MOVE_COPY, total_size, file_count, estimated_seconds, tree)
+
+
+def rename_folder(src, dst):
+    """同一磁盘卷内重命名文件夹，失败(例如文件被占用)时返回 False"""
+    try:
+        os.rename(src, dst)
+        return True
+    except OSError as e:
+        print(f"重命名 {src} 失败: {e}")
+        return False
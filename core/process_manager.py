@@ -50,7 +50,7 @@ def all_kill_process(failed_files: list):
 def find_file_process(failed_files: list):
     """
     查找占用指定文件列表中文件的进程，并返回包含根进程ID的进程信息字典
-    参数: failed_files - 只包含源文件路径的列表
+    参数: failed_files - 只包含源文件路径的列表(或 PathList)
     返回: 字典，键为文件路径，值为占用该文件的进程信息列表
     """
     all_process_info = {}
@@ -67,7 +67,7 @@ def find_file_process(failed_files: list):
                 continue
 
         # 进程扫描阶段：遍历所有进程，一次性检查所有文件
-        all_src_files = [src for src in failed_files if os.path.exists(src)]
+        all_src_files = {src for src in failed_files if os.path.exists(src)}
         if all_src_files:
             all_process_info = _scan_processes_for_files(
                 all_src_files, all_process_info)
@@ -0,0 +1,292 @@
+# core/scan_tree.py
+import os
+import sys
+from array import array
+
+
+class ScanTree:
+    """
+    紧凑的目录树扫描结果
+    只为目录建立记录: 目录名经过驻留(intern)后按父目录编号串成父指针表,
+    大小和文件数保存在 array 列中, 内存占用只随目录数量增长, 与文件数量无关。
+    scan_tree 扫描得到的目录编号按(排序后的)先序遍历分配, 子树的编号是连续的;
+    扫描之后再通过 add_dir 追加的目录只保证编号大于父目录, children() 不会返回它们。
+    with_files=True 时额外保存每个目录的修改时间和自身文件的名称、大小,
+    供权限修改、复制、删除等后续步骤复用, 并可通过 is_stale() 判断扫描结果是否过期。
+    文件名不驻留: 每个目录的文件名用 '\0' 连接成一个字符串, 大小保存在 array 中,
+    这部分内存与文件数量和文件名长度成正比(复制、删除使用的目录树都是这种)。
+    """
+    __slots__ = ('root', '_names', '_parents', '_sizes', '_file_counts',
+                 '_totals', '_total_counts', '_ends',
+                 '_mtimes', '_file_starts', '_file_names', '_file_sizes')
+
+    def __init__(self, root, with_files=False):
+        self.root = root
+        self._names = []                # 目录名, 根目录保存完整路径
+        self._parents = array('q')      # 父目录编号, 根目录为 -1
+        self._sizes = array('q')        # 目录自身(不含子目录)的文件总大小
+        self._file_counts = array('q')  # 目录自身(不含子目录)的文件数量
+        self._totals = None             # 含子目录的总大小(按需计算)
+        self._total_counts = None       # 含子目录的文件数量(按需计算)
+        self._ends = None               # 子树结束编号(不含)
+        self._mtimes = array('q') if with_files else None       # 目录修改时间(纳秒)
+        self._file_starts = array('q') if with_files else None  # 目录第一个文件大小的编号
+        self._file_names = [] if with_files else None           # 每个目录用 '\0' 连接的文件名
+        self._file_sizes = array('q') if with_files else None   # 文件大小
+
+    def __len__(self):
+        return len(self._parents)
+
+    @property
+    def has_files(self):
+        return self._file_names is not None
+
+    def add_dir(self, parent, name, mtime=0):
+        """添加一个目录记录，返回目录编号"""
+        self._names.append(sys.intern(name))
+        self._parents.append(parent)
+        self._sizes.append(0)
+        self._file_counts.append(0)
+        if self._file_names is not None:
+            self._mtimes.append(mtime)
+            self._file_starts.append(len(self._file_sizes))
+            self._file_names.append('')
+        self._totals = None
+        return len(self._parents) - 1
+
+    def add_files(self, node, size, count):
+        """把目录自身的文件大小和数量累加到目录记录上"""
+        self._sizes[node] += size
+        self._file_counts[node] += count
+        self._totals = None
+
+    def set_files(self, node, files):
+        """保存最后添加的目录 node 自身文件的(文件名, 大小)列表(仅 with_files=True)"""
+        names = []
+        size = 0
+        for name, file_size in files:
+            names.append(name)
+            self._file_sizes.append(file_size)
+            size += file_size
+        self._file_names[node] = '\0'.join(names)
+        self.add_files(node, size, len(names))
+
+    def name(self, node):
+        return self._names[node]
+
+    def parent(self, node):
+        return self._parents[node]
+
+    def path(self, node=0):
+        """根据父指针表拼接出目录的完整路径"""
+        parts = []
+        while node > 0:
+            parts.append(self._names[node])
+            node = self._parents[node]
+        parts.append(self._names[0])
+        parts.reverse()
+        return os.path.join(*parts)
+
+    def own_size(self, node):
+        return self._sizes[node]
+
+    def own_file_count(self, node):
+        return self._file_counts[node]
+
+    def files(self, node):
+        """依次返回目录自身文件的(文件名, 大小)"""
+        names = self._file_names[node]
+        if not names:
+            return
+        start = self._file_starts[node]
+        for i, name in enumerate(names.split('\0')):
+            yield name, self._file_sizes[start + i]
+
+    def total_size(self, node=0):
+        """目录及其所有子目录的文件总大小"""
+        self._aggregate()
+        return self._totals[node]
+
+    def total_file_count(self, node=0):
+        """目录及其所有子目录的文件总数"""
+        self._aggregate()
+        return self._total_counts[node]
+
+    def children(self, node=0):
+        """按编号顺序返回直接子目录的编号"""
+        self._aggregate()
+        child = node + 1
+        end = self._ends[node]
+        while child < end:
+            yield child
+            child = self._ends[child]
+
+    def is_stale(self):
+        """逐个检查目录的修改时间，任一目录被增删改过(或已不存在)即认为扫描结果已过期"""
+        if self._mtimes is None:
+            return True
+        for node in range(len(self._parents)):
+            try:
+                if os.stat(self.path(node)).st_mtime_ns != self._mtimes[node]:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def _aggregate(self):
+        """由子到父倒序累加一遍，得到子树大小、文件数和子树范围"""
+        if self._totals is not None:
+            return
+        count = len(self._parents)
+        totals = array('q', self._sizes)
+        total_counts = array('q', self._file_counts)
+        ends = array('q', range(1, count + 1))
+        parents = self._parents
+        for node in range(count - 1, 0, -1):
+            parent = parents[node]
+            totals[parent] += totals[node]
+            total_counts[parent] += total_counts[node]
+            if ends[node] > ends[parent]:
+                ends[parent] = ends[node]
+        self._totals = totals
+        self._total_counts = total_counts
+        self._ends = ends
+
+
+class ScannedDir:
+    """walk_dirs 生成的单个目录的扫描结果(不含子目录)"""
+    __slots__ = ('depth', 'name', 'path', 'mtime', 'size', 'file_count', 'files')
+
+    def __init__(self, depth, name, path, mtime=0, with_files=False):
+        self.depth = depth      # 根目录为 0
+        self.name = name        # 根目录为 walk_dirs 传入的路径
+        self.path = path
+        self.mtime = mtime      # 修改时间(纳秒)，仅 with_files=True 时记录
+        self.size = 0           # 目录自身的文件总大小
+        self.file_count = 0     # 目录自身的文件数量
+        self.files = [] if with_files else None  # 目录自身文件的(文件名, 大小)
+
+
+def walk_dirs(root_path, with_files=False):
+    """
+    使用 os.scandir 按(排序后的)先序逐个扫描目录，每扫描完一个目录就生成一个 ScannedDir
+    内存中只保存待扫描的目录；不进入指向目录的符号链接。
+    with_files=True 时额外记录目录的修改时间和自身文件的(文件名, 大小)
+    """
+    root_mtime = 0
+    if with_files:
+        try:
+            root_mtime = os.stat(root_path).st_mtime_ns
+        except OSError:
+            pass
+    # 栈中保存(深度, 目录名, 目录路径, 修改时间), 子目录按名称逆序入栈以保证按名称顺序先序遍历
+    stack = [(0, root_path, root_path, root_mtime)]
+    while stack:
+        depth, name, path, mtime = stack.pop()
+        scanned = ScannedDir(depth, name, path, mtime, with_files)
+        subdirs = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir():
+                            if not entry.is_symlink():
+                                subdirs.append((entry.name, entry.stat().st_mtime_ns if with_files else 0))
+                        else:
+                            size = entry.stat().st_size
+                            scanned.size += size
+                            scanned.file_count += 1
+                            if with_files:
+                                scanned.files.append((entry.name, size))
+                    except Exception as e:
+                        print(f"Error getting size for {entry.path}: {e}")
+        except Exception as e:
+            print(f"Error scanning folder {path}: {e}")
+        yield scanned
+        subdirs.sort(reverse=True)
+        for subdir, subdir_mtime in subdirs:
+            stack.append((depth + 1, subdir, os.path.join(path, subdir), subdir_mtime))
+
+
+def scan_tree(root_path, with_files=False):
+    """扫描目录树，返回 ScanTree，with_files=True 时保留每个文件的记录"""
+    tree = ScanTree(root_path, with_files)
+    ancestors = []  # 当前目录各级上级目录的编号
+    for scanned in walk_dirs(root_path, with_files):
+        del ancestors[scanned.depth:]
+        node = tree.add_dir(ancestors[-1] if ancestors else -1, scanned.name, scanned.mtime)
+        ancestors.append(node)
+        if with_files:
+            tree.set_files(node, scanned.files)
+        else:
+            tree.add_files(node, scanned.size, scanned.file_count)
+    return tree
+
+
+def fresh_tree(tree, root_path):
+    """
+    返回 root_path 对应的带文件记录的目录树
+    传入的树属于同一路径且没有过期时直接复用，否则重新扫描一次
+    """
+    if (tree is not None and tree.has_files
+            and os.path.normcase(os.path.abspath(tree.root)) == os.path.normcase(os.path.abspath(root_path))
+            and not tree.is_stale()):
+        return tree
+    return scan_tree(root_path, with_files=True)
+
+
+class PathList:
+    """
+    紧凑的文件路径列表(复制失败、删除残留、重试列表等)
+    每个目录路径只保存一次, 条目只保存目录编号、驻留后的文件名和错误信息编号。
+    迭代时逐个还原出完整路径, 不会一次性生成所有路径字符串。
+    """
+    __slots__ = ('_dirs', '_dir_ids', '_entry_dirs', '_entry_names',
+                 '_messages', '_message_ids', '_entry_messages')
+
+    def __init__(self, paths=()):
+        self._dirs = []                    # 目录路径
+        self._dir_ids = {}                 # 目录路径 -> 目录编号
+        self._entry_dirs = array('l')      # 条目所在目录编号
+        self._entry_names = []             # 条目文件名(已驻留)
+        self._messages = []                # 错误信息
+        self._message_ids = {}             # 错误信息 -> 编号
+        self._entry_messages = array('l')  # 条目错误信息编号, 没有为 -1
+        for path in paths:
+            self.append(path)
+
+    def __len__(self):
+        return len(self._entry_names)
+
+    def __bool__(self):
+        return len(self._entry_names) > 0
+
+    def __iter__(self):
+        """依次返回完整路径"""
+        for dir_id, name in zip(self._entry_dirs, self._entry_names):
+            yield os.path.join(self._dirs[dir_id], name)
+
+    def append(self, path, error=None):
+        """添加一个路径及可选的错误信息"""
+        folder, name = os.path.split(path)
+        dir_id = self._dir_ids.get(folder)
+        if dir_id is None:
+            dir_id = len(self._dirs)
+            self._dirs.append(folder)
+            self._dir_ids[folder] = dir_id
+        self._entry_dirs.append(dir_id)
+        self._entry_names.append(sys.intern(name))
+        if error is None:
+            self._entry_messages.append(-1)
+            return
+        message_id = self._message_ids.get(error)
+        if message_id is None:
+            message_id = len(self._messages)
+            self._messages.append(error)
+            self._message_ids[error] = message_id
+        self._entry_messages.append(message_id)
+
+    def items(self):
+        """依次返回(完整路径, 错误信息)"""
+        for path, message_id in zip(self, self._entry_messages):
+            yield path, (self._messages[message_id] if message_id >= 0 else None)
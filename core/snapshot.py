@@ -0,0 +1,150 @@
+# core/snapshot.py
+import csv
+import gzip
+import json
+import heapq
+from config.config import DISPLAY_FOLDER_COUNT
+from utils.convert_size import convert_size
+from core.scan_tree import walk_dirs
+
+SNAPSHOT_FIELDS = ('path', 'own_size', 'files')
+
+
+def _open_snapshot(path, mode):
+    """
+    按扩展名打开快照文件: .gz 结尾使用 gzip 压缩
+    使用 surrogatepass: 无法解码的文件名(POSIX)和未配对的代理字符(Windows)都能原样写入和读回
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8', errors='surrogatepass', newline='')
+    return open(path, mode, encoding='utf-8', errors='surrogatepass', newline='')
+
+
+def _is_csv(path):
+    return path.endswith('.csv') or path.endswith('.csv.gz')
+
+
+def _snapshot_rows(base_path):
+    """
+    边扫描边按先序生成每个目录的快照行(相对路径, 自身文件大小, 自身文件数)
+    相对路径使用 '/' 分隔，根目录为空字符串
+    """
+    names = []  # 根目录到当前目录的各级名称
+    for scanned in walk_dirs(base_path):
+        del names[scanned.depth:]
+        names.append(scanned.name)
+        yield '/'.join(names[1:]), scanned.size, scanned.file_count
+
+
+def export_snapshot(base_path, snapshot_path):
+    """
+    扫描文件夹并把每个目录自身的文件大小逐行写入快照文件，返回写入的行数
+    扩展名为 .csv/.csv.gz 时写 CSV，否则写 JSON Lines；行按路径的各级名称排序，便于直接合并比较
+    扫描和写入同时进行，内存占用只与目录深度和待访问的同级目录数有关
+    """
+    count = 0
+    with _open_snapshot(snapshot_path, 'w') as f:
+        if _is_csv(snapshot_path):
+            writer = csv.writer(f)
+            writer.writerow(SNAPSHOT_FIELDS)
+            for row in _snapshot_rows(base_path):
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in _snapshot_rows(base_path):
+                f.write(json.dumps(dict(zip(SNAPSHOT_FIELDS, row)), ensure_ascii=False))
+                f.write('\n')
+                count += 1
+    return count
+
+
+def read_snapshot(snapshot_path):
+    """逐行读取快照，生成(排序键, 相对路径, 自身文件大小)，并检查行是否有序"""
+    previous = None
+    with _open_snapshot(snapshot_path, 'r') as f:
+        if _is_csv(snapshot_path):
+            rows = ((row['path'], int(row['own_size'])) for row in csv.DictReader(f))
+        else:
+            rows = ((row['path'], int(row['own_size'])) for row in map(json.loads, filter(str.strip, f)))
+        for rel_path, size in rows:
+            key = tuple(rel_path.split('/')) if rel_path else ()
+            if previous is not None and key <= previous:
+                raise ValueError(f"快照文件 {snapshot_path} 未按路径排序: {rel_path}")
+            previous = key
+            yield key, rel_path, size
+
+
+def _merge_deltas(old_path, new_path):
+    """合并两个快照，按先序生成每个目录自身文件大小的变化(排序键, 相对路径, 变化量)"""
+    old_rows = read_snapshot(old_path)
+    new_rows = read_snapshot(new_path)
+    old_row = next(old_rows, None)
+    new_row = next(new_rows, None)
+    while old_row is not None or new_row is not None:
+        if new_row is None or (old_row is not None and old_row[0] < new_row[0]):
+            yield old_row[0], old_row[1], -old_row[2]
+            old_row = next(old_rows, None)
+        elif old_row is None or new_row[0] < old_row[0]:
+            yield new_row
+            new_row = next(new_rows, None)
+        else:
+            yield new_row[0], new_row[1], new_row[2] - old_row[2]
+            old_row = next(old_rows, None)
+            new_row = next(new_rows, None)
+
+
+def diff_snapshots(old_path, new_path, display_count=DISPLAY_FOLDER_COUNT, max_depth=None):
+    """
+    合并比较两个快照，返回(增长最多的文件夹, 减少最多的文件夹, 总变化量)
+    目录的变化量包含其所有子目录: 行按先序排列，用祖先栈把子目录的变化累加到上级目录。
+    两个快照各顺序读取一遍，只保存祖先栈和前 display_count 个结果，内存占用与快照大小无关
+    max_depth 限制参与比较的目录层级(1 表示只比较一级文件夹)
+    """
+    grown = []   # 最小堆，保存增长最多的(变化量, 路径)
+    shrunk = []  # 最小堆，保存减少最多的(-变化量, 路径)
+    total_delta = 0
+    ancestors = []  # [[排序键, 相对路径, 累计变化量], ...]
+
+    def finish():
+        nonlocal total_delta
+        key, rel_path, delta = ancestors.pop()
+        if ancestors:
+            ancestors[-1][2] += delta
+        if not key:
+            total_delta = delta
+        elif max_depth is None or len(key) <= max_depth:
+            if delta > 0:
+                _push_top(grown, (delta, rel_path), display_count)
+            elif delta < 0:
+                _push_top(shrunk, (-delta, rel_path), display_count)
+
+    for key, rel_path, delta in _merge_deltas(old_path, new_path):
+        # 弹出不是当前目录祖先的目录，它们的子树已经全部处理完
+        while ancestors and key[:len(ancestors[-1][0])] != ancestors[-1][0]:
+            finish()
+        ancestors.append([key, rel_path, delta])
+    while ancestors:
+        finish()
+    grown = [(rel_path, delta) for delta, rel_path in sorted(grown, reverse=True)]
+    shrunk = [(rel_path, -delta) for delta, rel_path in sorted(shrunk, reverse=True)]
+    return grown, shrunk, total_delta
+
+
+def _push_top(heap, item, limit):
+    """把结果放入大小固定的最小堆，只保留最大的 limit 个"""
+    if len(heap) < limit:
+        heapq.heappush(heap, item)
+    elif item > heap[0]:
+        heapq.heapreplace(heap, item)
+
+
+def display_snapshot_diff(grown, shrunk, total_delta):
+    """打印快照比较结果"""
+    sign = "-" if total_delta < 0 else "+"
+    print(f"\n=============快照比较结果: 总变化 {sign}{convert_size(abs(total_delta))}=============")
+    print("增长最多的文件夹:")
+    for i, (rel_path, delta) in enumerate(grown, 1):
+        print(f"{i}. {rel_path}: +{convert_size(delta)}")
+    print("减少最多的文件夹:")
+    for i, (rel_path, delta) in enumerate(shrunk, 1):
+        print(f"{i}. {rel_path}: -{convert_size(-delta)}")
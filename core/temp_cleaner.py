@@ -0,0 +1,119 @@
+# core/temp_cleaner.py
+import os
+import re
+import time
+import stat
+import fnmatch
+from config.config import TEMP_MIN_AGE_HOURS, TEMP_MIN_FILE_SIZE, TEMP_INCLUDE_PATTERNS, TEMP_EXCLUDE_PATTERNS
+
+FILE_ATTRIBUTE_REPARSE_POINT = 0x400
+
+
+def _compile_patterns(patterns):
+    """把多条通配符规则编译成一个不区分大小写的正则表达式，没有规则时返回 None"""
+    if not patterns:
+        return None
+    combined = '|'.join(f"(?:{fnmatch.translate(p)})" for p in patterns)
+    return re.compile(combined, re.IGNORECASE)
+
+
+class CleanupPolicy:
+    """
+    临时文件清理规则
+    包含/排除规则在创建时编译成合并后的正则，每个文件只需匹配一次。
+    排除规则同时作用于文件夹: 被排除的文件夹中的文件只计入总大小，不会被删除。
+    """
+    __slots__ = ('min_age', 'min_size', 'max_size', '_include', '_exclude')
+
+    def __init__(self, min_age_hours=TEMP_MIN_AGE_HOURS, include=TEMP_INCLUDE_PATTERNS,
+                 exclude=TEMP_EXCLUDE_PATTERNS, min_size=TEMP_MIN_FILE_SIZE, max_size=None):
+        self.min_age = min_age_hours * 3600
+        self.min_size = min_size
+        self.max_size = max_size
+        self._include = _compile_patterns(include)
+        self._exclude = _compile_patterns(exclude)
+
+    def is_excluded(self, name):
+        return self._exclude is not None and self._exclude.match(name) is not None
+
+    def matches(self, name, st, now):
+        """判断文件是否符合清理条件"""
+        if self._include is not None and self._include.match(name) is None:
+            return False
+        if self.is_excluded(name):
+            return False
+        if now - st.st_mtime < self.min_age:
+            return False
+        if st.st_size < self.min_size:
+            return False
+        if self.max_size is not None and st.st_size > self.max_size:
+            return False
+        return True
+
+
+class CleanupResult:
+    """清理(或预演)的统计结果"""
+    __slots__ = ('total_bytes', 'matched_files', 'matched_bytes', 'failed_files')
+
+    def __init__(self):
+        self.total_bytes = 0    # 扫描到的所有文件大小(包括被排除的文件夹)
+        self.matched_files = 0  # 符合规则(预演)或已删除的文件数
+        self.matched_bytes = 0  # 符合规则(预演)或已删除的文件大小
+        self.failed_files = 0   # 符合规则但删除失败的文件数
+
+
+def clean_folder(folder_path, policy=None, dry_run=False):
+    """
+    按清理规则一次遍历清理文件夹，dry_run=True 时只统计可释放的空间不删除任何文件
+    文件状态直接使用 os.scandir 缓存的 stat 结果，子文件夹在其内容处理完成后尝试删除
+    (只删除扫描时修改时间已超过 min_age 的文件夹，避免刚被程序创建的文件夹被删除后又重新创建)
+    被排除的文件夹仍然会进入统计大小，但其中的文件和文件夹都不会被删除
+    """
+    if policy is None:
+        policy = CleanupPolicy()
+    result = CleanupResult()
+    now = time.time()
+    # 栈中保存(文件夹路径, 是否已处理完子项, 是否位于被排除的文件夹中, 修改时间)
+    stack = [(folder_path, False, False, now)]
+    while stack:
+        path, visited, protected, mtime = stack.pop()
+        if visited:
+            # 子项处理完毕，删除已经清空且足够旧的文件夹(非空时删除失败，忽略即可)
+            if not dry_run and now - mtime >= policy.min_age:
+                try:
+                    os.rmdir(path)
+                except OSError:
+                    pass
+            continue
+        if path != folder_path and not protected:
+            stack.append((path, True, False, mtime))
+        try:
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                st = entry.stat(follow_symlinks=False)
+                if entry.is_dir(follow_symlinks=False):
+                    # 不进入目录链接(Junction Point)，避免删除链接目标中的文件
+                    if getattr(st, 'st_file_attributes', 0) & FILE_ATTRIBUTE_REPARSE_POINT:
+                        continue
+                    stack.append((entry.path, False, protected or policy.is_excluded(entry.name), st.st_mtime))
+                    continue
+            except OSError:
+                continue
+            if not stat.S_ISREG(st.st_mode):
+                continue
+            result.total_bytes += st.st_size
+            if protected or not policy.matches(entry.name, st, now):
+                continue
+            if not dry_run:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    result.failed_files += 1
+                    continue
+            result.matched_files += 1
+            result.matched_bytes += st.st_size
+    return result
@@ -0,0 +1,211 @@
+# core/throttle.py
+import os
+import sys
+import time
+import threading
+import psutil
+from config.config import THROTTLE_SAMPLE_INTERVAL, THROTTLE_LATENCY_FACTOR, THROTTLE_MIN_SCALE
+
+THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+IOCTL_STORAGE_GET_DEVICE_NUMBER = 0x002D1080
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶，rate 为每秒令牌数，None 表示不限制
+    一次取用超过桶容量时允许透支，之后的调用者按透支量等待，因此单次取用大小不受限制
+    """
+
+    def __init__(self, rate=None):
+        _check_rate(rate)
+        self._lock = threading.Lock()
+        self._rate = rate
+        self._tokens = rate or 0
+        self._updated = time.monotonic()
+
+    @property
+    def rate(self):
+        return self._rate
+
+    def set_rate(self, rate):
+        """运行中调整速率"""
+        _check_rate(rate)
+        with self._lock:
+            self._refill()
+            self._rate = rate
+            if rate is not None:
+                self._tokens = min(self._tokens, rate)
+
+    def consume(self, amount):
+        """取用令牌，令牌不足时阻塞等待"""
+        with self._lock:
+            if self._rate is None:
+                return
+            self._refill()
+            self._tokens -= amount
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+    def _refill(self):
+        now = time.monotonic()
+        if self._rate is not None:
+            # 桶容量为 1 秒的令牌数
+            self._tokens = min(self._rate, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+
+def _check_rate(rate):
+    if rate is not None and rate <= 0:
+        raise ValueError(f"限速必须大于 0: {rate}")
+
+
+class CopyThrottle:
+    """
+    复制限速: 字节/秒和文件/秒两个令牌桶，并根据系统盘的读延迟自适应退避
+    读延迟明显高于观测到的基线时，把实际速率减半；延迟恢复后逐步回升到设置的限速。
+    退避只在设置的限速以下进行，取消限速(None)后不再退避。
+    读延迟取自系统盘所在物理磁盘的计数器(找不到时使用所有磁盘的合计)，
+    其中也包含复制自身从系统盘读取的请求，因此复制本身造成的排队同样会触发退避。
+    """
+
+    def __init__(self, bytes_per_second=None, files_per_second=None, adaptive=True):
+        self._lock = threading.Lock()
+        self._bytes_limit = bytes_per_second  # 设置的限速，实际速率为 限速 * _scale
+        self._files_limit = files_per_second
+        self._bytes = TokenBucket(bytes_per_second)
+        self._files = TokenBucket(files_per_second)
+        self.adaptive = adaptive
+        self._scale = 1.0
+        self._baseline = None             # 基线读延迟(毫秒)
+        self._sample_at = time.monotonic()
+        self._disk = _system_disk_name()
+        self._sample_io = _disk_read_counters(self._disk)
+
+    @property
+    def bytes_per_second(self):
+        """设置的字节限速(不含自适应退避)"""
+        return self._bytes_limit
+
+    @property
+    def files_per_second(self):
+        return self._files_limit
+
+    def set_limits(self, bytes_per_second=None, files_per_second=None):
+        """运行中调整限速，None 表示不限制"""
+        with self._lock:
+            self._bytes_limit = bytes_per_second
+            self._files_limit = files_per_second
+            self._scale = 1.0
+            self._bytes.set_rate(bytes_per_second)
+            self._files.set_rate(files_per_second)
+
+    def consume_file(self):
+        self._files.consume(1)
+
+    def consume_bytes(self, amount):
+        if self.adaptive:
+            self._sample()
+        self._bytes.consume(amount)
+
+    def _sample(self):
+        """定期采样系统磁盘平均读延迟，调整实际速率"""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._sample_at
+            if elapsed < THROTTLE_SAMPLE_INTERVAL:
+                return
+            counters = _disk_read_counters(self._disk)
+            latency = None
+            if counters is not None and self._sample_io is not None:
+                reads = counters[0] - self._sample_io[0]
+                if reads > 0:
+                    latency = (counters[1] - self._sample_io[1]) / reads
+            self._sample_at = now
+            self._sample_io = counters
+            if latency is None or self._bytes_limit is None:
+                return
+            if self._baseline is None or latency < self._baseline:
+                self._baseline = latency
+            else:
+                # 基线缓慢跟随，避免一次偶然的低延迟让之后一直处于退避状态
+                self._baseline += (latency - self._baseline) * 0.05
+            if latency > max(self._baseline, 1) * THROTTLE_LATENCY_FACTOR:
+                self._scale = max(self._scale / 2, THROTTLE_MIN_SCALE)
+            elif self._scale < 1.0:
+                self._scale = min(self._scale + 0.1, 1.0)
+            self._bytes.set_rate(self._bytes_limit * self._scale)
+
+
+def _system_disk_name():
+    """
+    返回系统盘所在磁盘在 psutil.disk_io_counters(perdisk=True) 中的名称，找不到时返回 None
+    Windows 通过 IOCTL_STORAGE_GET_DEVICE_NUMBER 查询系统盘所在的 PhysicalDriveN，
+    Linux 通过 /sys/dev/block 找到根目录所在的块设备
+    """
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+
+            class StorageDeviceNumber(ctypes.Structure):
+                _fields_ = [('DeviceType', wintypes.DWORD),
+                            ('DeviceNumber', wintypes.DWORD),
+                            ('PartitionNumber', wintypes.DWORD)]
+
+            kernel32 = ctypes.windll.kernel32
+            kernel32.CreateFileW.restype = wintypes.HANDLE
+            system_drive = os.environ.get('SystemDrive', 'C:')
+            # 不需要读写权限，只查询设备编号; 3 = FILE_SHARE_READ | FILE_SHARE_WRITE, OPEN_EXISTING
+            handle = kernel32.CreateFileW(f"\\\\.\\{system_drive}", 0, 3, None, 3, 0, None)
+            if handle is None or handle == wintypes.HANDLE(-1).value:
+                return None
+            try:
+                number = StorageDeviceNumber()
+                returned = wintypes.DWORD(0)
+                if not kernel32.DeviceIoControl(wintypes.HANDLE(handle), IOCTL_STORAGE_GET_DEVICE_NUMBER,
+                                                None, 0, ctypes.byref(number), ctypes.sizeof(number),
+                                                ctypes.byref(returned), None):
+                    return None
+                return f"PhysicalDrive{number.DeviceNumber}"
+            finally:
+                kernel32.CloseHandle(wintypes.HANDLE(handle))
+        dev = os.stat(os.path.abspath(os.sep)).st_dev
+        block_path = f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}"
+        if os.path.exists(block_path):
+            return os.path.basename(os.path.realpath(block_path))
+    except Exception:
+        pass
+    return None
+
+
+def _disk_read_counters(disk=None):
+    """返回指定磁盘(None 或找不到时为所有磁盘合计)的(累计读次数, 累计读耗时毫秒)，无法获取时返回 None"""
+    try:
+        counters = None
+        if disk is not None:
+            counters = psutil.disk_io_counters(perdisk=True).get(disk)
+        if counters is None:
+            counters = psutil.disk_io_counters()
+        return counters.read_count, counters.read_time
+    except Exception:
+        return None
+
+
+def lower_thread_priority():
+    """
+    降低当前线程的 CPU 和 I/O 优先级
+    Windows 使用后台处理模式，Linux 设置线程的 ionice 为 idle 并提高 nice 值。
+    普通用户无法把 nice 值调回去，因此只在专门执行复制的工作线程中调用，线程结束即失效
+    """
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_MODE_BACKGROUND_BEGIN)
+            return
+        tid = threading.get_native_id()
+        psutil.Process(tid).ionice(psutil.IOPRIO_CLASS_IDLE)
+        os.setpriority(os.PRIO_PROCESS, tid, 19)
+    except Exception as e:
+        print(f"降低线程优先级失败: {e}")
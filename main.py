@@ -1,11 +1,15 @@
 # main.py
 import os
+import time
 import ctypes
 from utils.path_utils import get_roaming_folder, get_temp_folder, get_documents_folder, is_junction_point
 from core.folder_scanner import collect_folder_information, display_largest_folders
 from ui.user_interface import get_user_choice
 from core.folder_manager import prepare_destination_path, perform_copy_operation
-from core.folder_scanner import calculate_folder_size
+from core.scan_tree import scan_tree
+from core.temp_cleaner import CleanupPolicy, clean_folder
+from core.folder_watcher import watch_folder_growth
+from core.snapshot import export_snapshot, diff_snapshots, display_snapshot_diff
 from utils.convert_size import convert_size
 
 
@@ -23,10 +27,10 @@ def copy_selected_folder(folders: list):
                 break
         # 准备目标路径
         dest_folder_path = prepare_destination_path(
-            selected_folder_name, selected_folder_size)
+            selected_folder_name, selected_folder_size, selected_folder_path)
         if dest_folder_path is None:
             return
-        # 执行复制操作
+        # 执行复制操作(只为选定的文件夹建立带文件记录的目录树)
         perform_copy_operation(selected_folder_path,
                                dest_folder_path, selected_folder_name)
     except Exception as e:
@@ -34,41 +38,29 @@ def copy_selected_folder(folders: list):
 
 
 def delete_temp_files():
-    """删除当前用户的临时文件夹中的所有内容"""
+    """按清理规则删除当前用户的临时文件夹中的内容"""
     try:
         temp_path = get_temp_folder()
-        before_size = calculate_folder_size(temp_path)
-        print(f"临时文件夹{temp_path}占用空间: {convert_size(before_size)}")
-        start = input("确认删除临时文件夹中的所有内容？(Y/N): ").strip().lower()
+        policy = CleanupPolicy()
+        # 先预演一遍，统计可释放的空间
+        preview = clean_folder(temp_path, policy, dry_run=True)
+        print(f"临时文件夹{temp_path}占用空间: {convert_size(preview.total_bytes)}")
+        print(
+            f"符合清理规则的文件: {preview.matched_files} 个, 可释放空间: {convert_size(preview.matched_bytes)}")
+        if preview.matched_files == 0:
+            print("没有需要清理的临时文件")
+            return
+        start = input("确认删除临时文件夹中符合规则的内容？(Y/N): ").strip().lower()
         if start != 'y':
             print("已取消删除操作")
             return
         print(f"正在删除临时文件夹中的内容,请稍候...")
-        # 遍历临时文件夹中的所有文件和子文件夹
-        for root, dirs, files in os.walk(temp_path, topdown=False):
-            # 先删除文件
-            for file in files:
-                file_path = os.path.join(root, file)
-                try:
-                    os.remove(file_path)
-                    print(f"已删除文件: {file_path}")
-                except Exception as e:
-                    # print(f"无法删除文件 {file_path}: {e}")
-                    continue
-
-            # 再删除文件夹
-            for dir in dirs:
-                dir_path = os.path.join(root, dir)
-                try:
-                    os.rmdir(dir_path)
-                    # print(f"已删除文件夹: {dir_path}")
-                except Exception as e:
-                    # print(f"无法删除文件夹 {dir_path}: {e}")
-                    continue
-        after_size = calculate_folder_size(temp_path)
-        freed_space = before_size - after_size
+        result = clean_folder(temp_path, policy)
+        after_size = result.total_bytes - result.matched_bytes
+        if result.failed_files:
+            print(f"{result.failed_files} 个文件正在被占用，已跳过")
         print(
-            f"临时文件夹内容清理完成，释放空间: {convert_size(freed_space)},当前占用空间: {convert_size(after_size)}")
+            f"临时文件夹内容清理完成，释放空间: {convert_size(result.matched_bytes)},当前占用空间: {convert_size(after_size)}")
     except Exception as e:
         print(f"清理临时文件夹时出错: {e}")
 
@@ -83,16 +75,17 @@ def transfer_documents():
             print(f"文件夹{docs_path}已创建链接，请重新选择!\n")
             return
 
-        # 计算文档文件夹大小（使用已有的函数）
-        total_size = calculate_folder_size(docs_path)
+        # 扫描文档文件夹并计算大小，扫描结果供之后的复制等步骤复用
+        docs_tree = scan_tree(docs_path, with_files=True)
+        total_size = docs_tree.total_size()
 
         # 准备目标路径（使用已有的函数）
         dest_folder_path = prepare_destination_path(
-            docs_name, total_size)
+            docs_name, total_size, docs_path)
         if dest_folder_path is None:
             return
         # 执行复制操作（使用已有的函数）
-        perform_copy_operation(docs_path, dest_folder_path, docs_name)
+        perform_copy_operation(docs_path, dest_folder_path, docs_name, docs_tree)
     except Exception as e:
         print(f"转移文档文件夹时出错: {e}\n")
 
@@ -115,6 +108,39 @@ def transfer_app_data():
         print(f"转移应用数据时出错: {e}")
 
 
+def watch_app_data():
+    """监控应用数据文件夹的增长情况"""
+    try:
+        watch_folder_growth(get_roaming_folder())
+    except Exception as e:
+        print(f"监控应用数据时出错: {e}")
+
+
+def export_app_data_snapshot():
+    """导出应用数据文件夹的大小快照"""
+    try:
+        roaming_path = get_roaming_folder()
+        default_path = f"roaming_snapshot_{time.strftime('%Y%m%d_%H%M%S')}.jsonl.gz"
+        snapshot_path = input(
+            f"请输入快照文件路径(.jsonl/.csv,可加.gz压缩),不输入则默认为{default_path}: ").strip() or default_path
+        print(f"Scanning files in folder: {roaming_path} ...")
+        count = export_snapshot(roaming_path, snapshot_path)
+        print(f"快照导出完成，共 {count} 个文件夹: {os.path.abspath(snapshot_path)}")
+    except Exception as e:
+        print(f"导出快照时出错: {e}")
+
+
+def compare_snapshots():
+    """比较两个快照，显示增长和减少最多的文件夹"""
+    try:
+        old_path = input("请输入旧快照文件路径: ").strip()
+        new_path = input("请输入新快照文件路径: ").strip()
+        grown, shrunk, total_delta = diff_snapshots(old_path, new_path)
+        display_snapshot_diff(grown, shrunk, total_delta)
+    except Exception as e:
+        print(f"比较快照时出错: {e}")
+
+
 def main():
     """主函数，提供菜单选择"""
     print("\n===================C盘清理工具===================")
@@ -132,6 +158,9 @@ def main():
         print("1. 删除系统盘临时文件")
         print("2. 转移文档数据")
         print("3. 转移应用数据")
+        print("4. 监控应用数据增长")
+        print("5. 导出应用数据快照")
+        print("6. 比较应用数据快照")
         choice = input("\n请选择要执行操作的对应的序号,或输入'q'退出,回车键确认:").strip().lower()
         if choice == '1':
             delete_temp_files()
@@ -139,6 +168,12 @@ def main():
             transfer_documents()
         elif choice == '3':
             transfer_app_data()
+        elif choice == '4':
+            watch_app_data()
+        elif choice == '5':
+            export_app_data_snapshot()
+        elif choice == '6':
+            compare_snapshots()
         elif choice == 'q':
             print("程序已退出。")
             break
@@ -1,9 +1,11 @@
 # ui/user_interface.py
 import os
 import time
+import stat
 import shutil
-from config.config import RETRY_DELAY, MAX_RETRIES, DISPLAY_FOLDER_COUNT
+from config.config import RETRY_DELAY, MAX_RETRIES, DISPLAY_FOLDER_COUNT, THROTTLE_FILES_PER_SECOND, THROTTLE_KEY_POLL_INTERVAL
 from core.process_manager import all_kill_process
+from core.scan_tree import PathList, scan_tree, fresh_tree
 
 
 def get_user_choice(folders):
@@ -30,34 +32,38 @@ def get_user_choice(folders):
             print(f"function of get_user_choice is error: {e}")
 
 
-def delete_file_or_folder(path):
-    """专门处理文件或文件夹删除操作，使用ignore_errors=True删除，然后处理残留文件"""
+def delete_file_or_folder(path, tree=None):
+    """
+    专门处理文件或文件夹删除操作，按目录树由内向外删除，然后处理残留文件
+    tree 为之前扫描 path 得到的目录树，未过期时直接复用，不再重复遍历
+    """
     success = False
-    from core.folder_manager import _modify_permissions_recursive
+    from core.folder_manager import _modify_permissions_tree
     # 检查路径是否为目录
     if not os.path.isdir(path):
         print(f"参数必须是目录地址: {path}")
         return False
-    _modify_permissions_recursive(path)
+    tree = fresh_tree(tree, path)
+    _modify_permissions_tree(tree)
     # 尝试删除目录，最多重试MAX_RETRIES次
     del_count = 0
     print(f"=========开始删除目录{path}==========\n")
     while os.path.exists(path) and del_count < MAX_RETRIES:
         del_count += 1
-        # 使用ignore_errors=True删除目录
         print(f"开始第{del_count}次删除目录{path}...")
-        shutil.rmtree(path, ignore_errors=True)
+        _delete_tree(tree)
         # 检查目录是否仍存在
         time.sleep(RETRY_DELAY)
         if os.path.exists(path):
             # 提取所有残留文件的路径
-            failed_files = []
+            failed_files = PathList()
             try:
-                # 递归遍历残留目录，收集所有文件路径
-                for root, _, files in os.walk(path):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        failed_files.append(file_path)
+                # 重新扫描残留目录，收集所有文件路径，下一次删除也使用该扫描结果
+                tree = scan_tree(path, with_files=True)
+                for node in range(len(tree)):
+                    dir_path = tree.path(node)
+                    for file, _ in tree.files(node):
+                        failed_files.append(os.path.join(dir_path, file))
                 if failed_files:
                     print(f"发现 {len(failed_files)} 个无法删除的文件")
                     # 调用修改后的find_file_process函数，传入文件列表
@@ -80,6 +86,47 @@ def delete_file_or_folder(path):
         return success
 
 
+def _delete_tree(tree):
+    """
+    按目录树由内向外删除文件和文件夹，忽略错误；目录树中没有的内容交给 shutil.rmtree 处理
+    目录链接(Junction Point)只删除链接本身，不删除链接目标中的内容
+    """
+    # linked[node]: 0 普通目录，1 链接本身，2 位于链接之下
+    linked = bytearray(len(tree))
+    for node in range(1, len(tree)):
+        if linked[tree.parent(node)]:
+            linked[node] = 2
+        elif _is_link(tree.path(node)):
+            linked[node] = 1
+    for node in range(len(tree) - 1, -1, -1):
+        if linked[node] == 2:
+            continue
+        dir_path = tree.path(node)
+        if linked[node] == 0:
+            for file, _ in tree.files(node):
+                try:
+                    os.remove(os.path.join(dir_path, file))
+                except OSError:
+                    pass
+        try:
+            os.rmdir(dir_path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            if linked[node] == 0:
+                shutil.rmtree(dir_path, ignore_errors=True)
+
+
+def _is_link(path):
+    """判断目录是否是符号链接或目录链接(Junction Point)"""
+    FILE_ATTRIBUTE_REPARSE_POINT = 0x400
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISLNK(st.st_mode) or bool(getattr(st, 'st_file_attributes', 0) & FILE_ATTRIBUTE_REPARSE_POINT)
+
+
 def confirm_overwrite(folder_path):
     """询问用户是否确认覆盖已存在的文件夹"""
     print(f"文件夹 {folder_path} 已存在。")
@@ -102,6 +149,73 @@ def confirm_kill_process():
     return input("\n是否要终止相关进程，然后重新尝试? (Y/N): ").strip().lower() == 'y'
 
 
+def ask_copy_throttle():
+    """询问用户是否限速复制，返回 CopyThrottle，不限速时返回 None"""
+    from core.throttle import CopyThrottle
+    while True:
+        choice = input(
+            "\n是否限速复制以减少对电脑使用的影响? 输入每秒最大复制的MB数(不输入则不限速),回车键确认: ").strip()
+        if choice == "":
+            return None
+        try:
+            bytes_per_second = int(float(choice) * 1024 * 1024)
+        except (ValueError, OverflowError):
+            continue
+        if bytes_per_second < 1:
+            print("限速太小，请重新输入")
+            continue
+        print("复制过程中可按 '+' 键提高限速、'-' 键降低限速、'0' 键取消限速")
+        return CopyThrottle(bytes_per_second, THROTTLE_FILES_PER_SECOND)
+
+
+def poll_throttle_keys(throttle, pbar):
+    """复制过程中检查按键并调整限速(仅 Windows 控制台支持)"""
+    try:
+        import msvcrt
+    except ImportError:
+        return
+    while msvcrt.kbhit():
+        key = msvcrt.getwch()
+        bytes_limit = throttle.bytes_per_second
+        files_limit = throttle.files_per_second
+        if key == '+' and bytes_limit is not None:
+            bytes_limit *= 2
+        elif key == '-':
+            bytes_limit = max((bytes_limit or 64 * 1024 * 1024) // 2, 1)
+        elif key == '0':
+            bytes_limit = None
+            files_limit = None
+        else:
+            continue
+        throttle.set_limits(bytes_limit, files_limit)
+        if bytes_limit is None:
+            pbar.write("已取消限速")
+        else:
+            pbar.write(f"限速已调整为 {bytes_limit / (1024 * 1024):.3g} MB/s")
+
+
+def watch_throttle_keys(throttle, pbar, stop):
+    """
+    在单独的线程中定期检查按键调整限速，直到 stop(threading.Event)被设置
+    按键不再只在文件之间检查，复制单个大文件的过程中也能随时调整
+    """
+    while not stop.wait(THROTTLE_KEY_POLL_INTERVAL):
+        poll_throttle_keys(throttle, pbar)
+
+
+def show_move_plan(plan):
+    """显示文件夹移动方案和预计耗时"""
+    from core.move_planner import MOVE_RENAME
+    from utils.convert_size import convert_size
+    print(f"\n=============移动方案=============")
+    if plan.strategy == MOVE_RENAME:
+        print("源文件夹和目标位置在同一磁盘卷，直接重命名，预计耗时不到1秒")
+        return
+    minutes, seconds = divmod(int(plan.estimated_seconds + 0.5), 60)
+    print("源文件夹和目标位置在不同磁盘卷，复制后删除源文件夹")
+    print(f"共 {plan.file_count} 个文件, {convert_size(plan.total_size)}, 预计耗时约 {minutes} 分 {seconds} 秒")
+
+
 def re_copy_failed_files(failed_files, src_folder, dest_folder):
     """处理复制失败的文件，调用find_file_process查找并终止占用进程，然后重新复制所有文件"""
     retry_success_count = 0
@@ -113,7 +227,7 @@ def re_copy_failed_files(failed_files, src_folder, dest_folder):
 
     # 尝试重新复制所有失败的文件
     print("\n===== 开始重新复制所有失败的文件 =====")
-    for src, error in failed_files:
+    for src in failed_files:
         if os.path.exists(src):
             print(f"尝试重新复制文件: {src}")
             if retry_copy_file(src, src_folder, dest_folder):
@@ -124,7 +238,7 @@ def re_copy_failed_files(failed_files, src_folder, dest_folder):
 
 def retry_copy_file(src, src_folder, dest_folder):
     """尝试多次复制文件，返回是否成功"""
-    import shutil
+    from core.file_copier import copy_file
     retry_count = 0
     success = False
 
@@ -134,8 +248,7 @@ def retry_copy_file(src, src_folder, dest_folder):
                 dest_folder, os.path.relpath(src, src_folder)
             )
             print(f"--------尝试复制--------: {src}\n")
-            dst_path_dir = os.path.dirname(dst_path)
-            shutil.copy2(src, dst_path_dir)
+            copy_file(src, dst_path)
             print(f"成功重新复制文件: {src}")
             success = True
         except Exception as e:
@@ -148,8 +261,8 @@ def retry_copy_file(src, src_folder, dest_folder):
     return success
 
 
-def show_copy_results(copied, retry_success_count, failed_folders, src_folder, dest_folder):
-    """显示复制操作的最终结果"""
+def show_copy_results(copied, retry_success_count, failed_folders, src_folder, dest_folder, tree=None):
+    """显示复制操作的最终结果，tree 为扫描源文件夹时得到的目录树"""
     from core.folder_manager import create_directory_junction
     total_success = copied + retry_success_count
     print(f"\n=============复制完成=============")
@@ -161,8 +274,8 @@ def show_copy_results(copied, retry_success_count, failed_folders, src_folder, d
 
     if failed_folders:
         print(f"{len(failed_folders)} 个文件夹复制并创建失败:")
-        for src, error in failed_folders:
+        for src, error in failed_folders.items():
             print(f"{src}: {error}")
     else:
         print("所有文件夹创建成功!\n")
-        create_directory_junction(src_folder, dest_folder)
+        create_directory_junction(src_folder, dest_folder, tree)